@@ -7,10 +7,10 @@ from coba.learners import Learner
 from coba.simulations import Simulation, Take, Shuffle
 from coba.registry import CobaRegistry
 from coba.config import CobaConfig, CobaFatal
-from coba.pipes import Pipe, Filter, Source, JsonDecode, ResponseToLines, HttpSource, MemorySource, DiskSource
+from coba.pipes import Pipe, Filter, Source, IdentityFilter, JsonDecode, ResponseToLines, HttpSource, MemorySource, DiskSource
 from coba.multiprocessing import MultiprocessFilter
 
-from coba.benchmarks.tasks import ChunkByNone, CreateTasks, FilterFinished, ChunkByTask, ChunkBySource, ProcessTasks
+from coba.benchmarks.tasks import ChunkByNone, CreateTasks, FilterFinished, ChunkByTask, ChunkBySource, ProcessTasks, Shard
 from coba.benchmarks.transactions import Transaction, TransactionSink
 from coba.benchmarks.results import Result
 
@@ -72,6 +72,7 @@ class Benchmark:
         self._maxtasksperchild    : Optional[int]        = None
         self._maxtasksperchild_set: bool                 = False
         self._chunk_by            : Optional[str]        = None
+        self._shard               : Optional[Shard]      = None
 
     def chunk_by(self, value: str = 'source') -> 'Benchmark':
         """Determines how tasks are chunked for processing.
@@ -86,6 +87,18 @@ class Benchmark:
 
         return self
 
+    def shard(self, shard: int, n_shards: int) -> 'Benchmark':
+        """Determines which portion of the Benchmark's tasks will be evaluated.
+
+        Args:
+            shard: The index of the portion to evaluate. This must be in [0, n_shards).
+            n_shards: The number of portions the Benchmark's tasks are split into. Running
+                every shard, for example on separate machines, evaluates every task once.
+        """
+
+        self._shard = Shard(shard, n_shards)
+        return self
+
     def processes(self, value:int = 1) -> 'Benchmark':
         """Determines how many processes will be utilized for processing Benchmark chunks.
         
@@ -140,6 +153,7 @@ class Benchmark:
             
         tasks            = CreateTasks(self._simulations, learners, seed)
         unfinished       = FilterFinished(restored)
+        sharded          = self._shard or IdentityFilter()
         chunked          = ChunkByTask() if cb == 'task' else ChunkByNone() if cb == 'none' else ChunkBySource()
         process          = ProcessTasks()
         transaction_sink = TransactionSink(result_file, restored)
@@ -147,8 +161,8 @@ class Benchmark:
         if mp > 1 or mt is not None  : process = MultiprocessFilter([process], mp, mt) #type: ignore
 
         try:
-            Pipe.join(MemorySource(preamble), []                            , transaction_sink).run()
-            Pipe.join(tasks                 , [unfinished, chunked, process], transaction_sink).run()
+            Pipe.join(MemorySource(preamble), []                                    , transaction_sink).run()
+            Pipe.join(tasks                 , [unfinished, sharded, chunked, process], transaction_sink).run()
         except KeyboardInterrupt:
             CobaConfig.Logger.log("Benchmark evaluation was manually aborted via Ctrl-C")
         except CobaFatal:
@@ -37,7 +37,7 @@ class Table:
             assert len(row.keys() & primary_cols) == len(primary_cols), 'A Table row was provided without a primary key.'
 
         all_columns   = list(chain(primary_cols, index_cols(), *data_cols()))
-        self._columns = sorted(set(all_columns), key=lambda col: all_columns.index(col))
+        self._columns = list(dict.fromkeys(all_columns))
 
         self._rows_keys: List[Hashable               ] = []               
         self._rows_flat: Dict[Hashable, Dict[str,Any]] = {}
@@ -1,7 +1,8 @@
-from copy import deepcopy
-from itertools import groupby, product, count
-from collections import defaultdict
-from typing import Iterable, Sequence, Any, Optional, Dict, Hashable, Tuple
+from itertools import product, count
+from queue import Queue
+from threading import Thread, Event
+from collections import defaultdict, Counter
+from typing import Iterable, Sequence, Any, Optional, Dict, Hashable, Tuple, List, Set
 
 from coba.random import CobaRandom
 from coba.learners import Learner, SafeLearner
@@ -16,9 +17,10 @@ from coba.benchmarks.results import Result
 class Identifier():
     
     def __init__(self) -> None:
-        self._source_ids   : Dict[Hashable, int]  = defaultdict(lambda x=count(): next(x)) # type: ignore
-        self._learner_ids  : Dict[Hashable, int]  = defaultdict(lambda x=count(): next(x)) # type: ignore
-        self._simulaion_ids: Dict[Hashable, int]  = defaultdict(lambda x=count(): next(x)) # type: ignore
+        #each dictionary hands out ids in the order its keys are first seen
+        self._source_ids   : Dict[Hashable, int]  = defaultdict(count().__next__)
+        self._learner_ids  : Dict[Hashable, int]  = defaultdict(count().__next__)
+        self._simulaion_ids: Dict[Hashable, int]  = defaultdict(count().__next__)
 
     def id(self, simulation: Simulation, learner: Learner) -> Tuple[int,int,int]:
         source = simulation._source if isinstance(simulation, Pipe.SourceFilters) else simulation
@@ -33,10 +35,14 @@ class Task(Filter[Iterable[Interaction], Iterable[Any]]):
 
     def __init__(self, src_id:int, sim_id: int, lrn_id: int, simulation: Simulation, learner: Optional[Learner]) -> None:
 
-        self.sim_pipe   = simulation
-        self.sim_source = simulation._source if isinstance(simulation, Pipe.SourceFilters) else simulation
-        self.sim_filter = simulation._filter if isinstance(simulation, Pipe.SourceFilters) else IdentityFilter()
-        self.learner    = SafeLearner(learner) if learner else None
+        self.sim_pipe = simulation
+
+        if isinstance(simulation, Pipe.SourceFilters):
+            self.sim_source, self.sim_filter = simulation._source, simulation._filter
+        else:
+            self.sim_source, self.sim_filter = simulation, IdentityFilter()
+
+        self.learner = SafeLearner(learner) if learner else None
 
         self.src_id = src_id
         self.sim_id = sim_id
@@ -50,16 +56,22 @@ class EvaluationTask(Task):
 
     def filter(self, interactions: Iterable[Interaction]) -> Iterable[Any]:
 
+        interactions = list(interactions)
+
         if not interactions: return
 
-        learner = deepcopy(self.learner)
+        learner = self.learner.clone()
         random  = CobaRandom(self._seed)
 
+        #Drawing every uniform we need for action selection in one call is much cheaper than drawing
+        #them one at a time per interaction and it produces the exact same sequence of random numbers.
+        uniforms = random.randoms(len(interactions))
+
         with CobaConfig.Logger.time(f"Evaluating learner {self.lrn_id} on Simulation {self.sim_id}..."):
 
             row_data = defaultdict(list)
 
-            for interaction in interactions:
+            for interaction, uniform in zip(interactions, uniforms):
 
                 context   = interaction.context
                 actions   = interaction.actions
@@ -67,14 +79,18 @@ class EvaluationTask(Task):
 
                 probs,info  = learner.predict(context, actions)
 
-                action = random.choice(actions, probs)
-                reward = feedbacks[actions.index(action)]
-                prob   = probs[actions.index(action)]
+                index = random.choice_index(probs, uniform)
+
+                action = actions[index]
+                reward = feedbacks[index]
+                prob   = probs[index]
 
                 info = learner.learn(context, action, reward, prob, info) or {}
-                                                        
-                for key,value in info.items() | {('reward',reward)}: 
-                    row_data[key].append(value)
+
+                row_data['reward'].append(reward)
+
+                for key,value in info.items():
+                    if key != 'reward': row_data[key].append(value)
 
             yield Transaction.interactions(self.sim_id, self.lrn_id, _packed=row_data)
 
@@ -85,10 +101,25 @@ class SimulationTask(Task):
         with CobaConfig.Logger.time(f"Calculating Simulation {self.sim_id} statistics..."):
             extra_statistics = {}
 
-            contexts,actions,feedbacks = zip(*[ (i.context, i.actions, i.feedbacks) for i in interactions])
-
             if isinstance(self.sim_source, (ClassificationSimulation,OpenmlSimulation)):
 
+                contexts  : List[Any]      = []
+                labels    : List[Any]      = []
+                features  : Set[Hashable]  = set()
+                label_cnts: Dict[Any, int] = defaultdict(int)
+
+                #we gather everything we need in a single pass because the Interaction
+                #properties are recalculated on every access and simulations can be large
+                for interaction in interactions:
+
+                    context = interaction.context
+                    label   = interaction.actions[interaction.feedbacks.index(1)]
+
+                    contexts.append(context)
+                    labels.append(label)
+                    features.update(context.keys() if isinstance(context,dict) else range(len(context)))
+                    label_cnts[label] += 1
+
                 try:
                     PackageChecker.sklearn("")
 
@@ -97,7 +128,7 @@ class SimulationTask(Task):
                     from sklearn.model_selection import cross_val_score
 
                     X   = contexts
-                    y   = [ a[f.index(1)] for a,f in zip(actions,feedbacks)]
+                    y   = labels
                     clf = RandomForestClassifier(n_estimators=50)
 
                     if any(isinstance(f,str) for f in X[0]):
@@ -113,20 +144,7 @@ class SimulationTask(Task):
                 except ImportError:
                     pass
 
-                labels     = set()
-                features   = set() 
-                label_cnts = defaultdict(int)
-
-                for c,a,f in zip(contexts,actions,feedbacks):
-
-                    inter_label = a[f.index(1)]
-                    inter_feats = c.keys() if isinstance(c,dict) else range(len(c))
-
-                    labels.add(inter_label)
-                    features.update(inter_feats)
-                    label_cnts[inter_label] += 1
-
-                extra_statistics["action_cardinality"] = len(labels)
+                extra_statistics["action_cardinality"] = len(label_cnts)
                 extra_statistics["context_dimensions"] = len(features)
                 extra_statistics["imbalance_ratio"]    = round(max(label_cnts.values())/min(label_cnts.values()),4)
 
@@ -181,29 +199,55 @@ class FilterFinished(Filter[Iterable[Task], Iterable[Task]]):
 
     def filter(self, tasks: Iterable[Task]) -> Iterable[Task]:
 
+        #Table membership checks scan all of its keys so we make sets once up front
+        finished_sims = set(self._restored.simulations.keys)
+        finished_ints = set(self._restored._interactions.keys)
+
         def is_not_complete(task: Task):
 
             if isinstance(task,SimulationTask):
-                return task.sim_id not in self._restored.simulations
+                return task.sim_id not in finished_sims
 
             if isinstance(task,EvaluationTask):
-                return (task.sim_id,task.lrn_id) not in self._restored._interactions
+                return (task.sim_id,task.lrn_id) not in finished_ints
 
             raise Exception("Unrecognized Task")
 
         return filter(is_not_complete, tasks)
 
+class Shard(Filter[Iterable[Task], Iterable[Task]]):
+
+    _K = 1_000_003
+
+    def __init__(self, shard: int, n_shards: int) -> None:
+
+        assert 0 <= shard < n_shards, "The given shard must be at least 0 and less than the number of shards."
+
+        self._shard    = shard
+        self._n_shards = n_shards
+
+    def filter(self, tasks: Iterable[Task]) -> Iterable[Task]:
+
+        #Shards must be the same on every machine/process that runs one so we use plain integer
+        #arithmetic rather than hash() (whose value for tuples changed in Python 3.8). Simulation
+        #tasks have no learner so they're treated as learner -1 which places them at sim_id*K.
+        def in_shard(task: Task) -> bool:
+            lrn_id = -1 if task.lrn_id is None else task.lrn_id
+            return (task.sim_id * Shard._K + lrn_id + 1) % self._n_shards == self._shard
+
+        return filter(in_shard, tasks)
+
 class ChunkBySource(Filter[Iterable[Task], Iterable[Iterable[Task]]]):
 
     def filter(self, tasks: Iterable[Task]) -> Iterable[Iterable[Task]]:
 
-        srt_key = lambda t: t.src_id
-        grp_key = lambda t: t.src_id
+        tasks_by_src: Dict[int, List[Task]] = defaultdict(list)
 
-        tasks = list(tasks)
+        for task in tasks:
+            tasks_by_src[task.src_id].append(task)
 
-        for _, group in groupby(sorted(tasks, key=srt_key), key=grp_key):
-            yield list(group)
+        for tasks_of_src in tasks_by_src.values():
+            yield tasks_of_src
 
 class ChunkByTask(Filter[Iterable[Task], Iterable[Iterable[Task]]]):
 
@@ -227,39 +271,130 @@ class ProcessTasks(Filter[Iterable[Iterable[Task]], Iterable[Any]]):
 
     def _process_chunk(self, task_group: Iterable[Task]) -> Iterable[Any]:
 
-        source_by_id = { t.src_id: t.sim_source for t in task_group }
-        filter_by_id = { t.sim_id: t.sim_filter for t in task_group }
+        source_by_id: Dict[int, Source] = {}
+        filter_by_id: Dict[int, Filter] = {}
+
+        tasks_by_src_sim: Dict[int, Dict[int, List[Task]]] = defaultdict(lambda: defaultdict(list))
 
-        srt_src = lambda t: t.src_id
-        grp_src = lambda t: t.src_id
-        srt_sim = lambda t: t.sim_id
-        grp_sim = lambda t: t.sim_id
+        #a chunk may be a one-shot iterable so we collect everything we need from it in one pass
+        for task in task_group:
+            source_by_id[task.src_id] = task.sim_source
+            filter_by_id[task.sim_id] = task.sim_filter
+            tasks_by_src_sim[task.src_id][task.sim_id].append(task)
 
         with CobaConfig.Logger.log(f"Processing chunk..."):
 
-            for src_id, tasks_by_src in groupby(sorted(task_group, key=srt_src), key=grp_src):
+            groups = list(tasks_by_src_sim.items())
 
-                try:
+            #We read sources on a background thread so that the next source can be
+            #loaded while the tasks for the current source are being evaluated.
+            loaded_sources: Queue = Queue(maxsize=1)
+            stop_loading = Event()
+            source_loader = Thread(target=self._load_sources, args=([source_by_id[src_id] for src_id,_ in groups], loaded_sources, stop_loading))
+            source_loader.daemon = True
+            source_loader.start()
+
+            try:
+                for src_id, tasks_by_sim in groups:
+
+                    try:
+
+                        with CobaConfig.Logger.time(f"Creating source {src_id} from {source_by_id[src_id]}..."):
+                            loaded_source, exception = loaded_sources.get()
+                            loaded_sources.task_done()
+
+                            if exception is not None: raise exception
+
+                        #we only keep a filter's output if a later simulation will reuse it and drop it after its last use
+                        filtered_source: Dict[Tuple[str,...], Any] = {}
+                        filter_uses = Counter(key for sim_id in tasks_by_sim for key in self._filter_keys(filter_by_id[sim_id]))
+
+                        for sim_id, tasks_by_src_sim in tasks_by_sim.items():
+
+                            with CobaConfig.Logger.time(f"Creating simulation {sim_id} from source {src_id}..."):
+                                interactions = self._filter_source(loaded_source, filter_by_id[sim_id], filtered_source, filter_uses)
+
+                            if not interactions:
+                                CobaConfig.Logger.log(f"Simulation {sim_id} has nothing to evaluate (likely due to `take` being larger than the simulation).")
+                                continue
+
+                            for task in tasks_by_src_sim:
+                                try:
+                                    for transaction in task.filter(interactions): 
+                                        yield transaction
+                                except Exception as e:
+                                    CobaConfig.Logger.log_exception(e)
+
+                        #release the source before the next one is taken off the queue
+                        loaded_source = interactions = filtered_source = filter_uses = None
+
+                    except Exception as e:
+                        CobaConfig.Logger.log_exception(e)
+
+                #every source has been taken off the queue so the loader is already finishing
+                source_loader.join()
+
+            finally:
+                #our consumer may stop early (e.g., the generator is closed or interrupted) so we tell
+                #the loader to stop and take anything it has loaded off of the queue. We don't wait for
+                #the loader in this case because it may be in the middle of a long read (e.g., a download).
+                stop_loading.set()
+
+                while not loaded_sources.empty():
+                    loaded_sources.get_nowait()
+                    loaded_sources.task_done()
+
+    def _filter_keys(self, sim_filter: Filter) -> Sequence[Tuple[str,...]]:
+
+        filters = sim_filter._filters if isinstance(sim_filter, Pipe.FiltersFilter) else [sim_filter]
+
+        #Seeded Shuffles and Takes always give the same output for the same input and never modify their input.
+        #This means simulations on a source whose filters begin the same way can share those filters' output.
+        #(We check exact types because subclasses can change `filter` without changing their repr)
+        is_memoizable = lambda filter: type(filter) in (Shuffle, Take, IdentityFilter) and getattr(filter, '_seed', 0) is not None
+
+        if not all(map(is_memoizable, filters)): return []
+
+        reprs = list(map(repr, filters))
+
+        return [ tuple(reprs[:i+1]) for i in range(len(reprs)) ]
+
+    def _filter_source(self, loaded_source: Any, sim_filter: Filter, filtered_source: Dict[Tuple[str,...], Any], filter_uses: Dict[Tuple[str,...], int]) -> Any:
+
+        filter_keys = self._filter_keys(sim_filter)
+
+        if not filter_keys:
+            return sim_filter.filter(loaded_source)
+
+        filters      = sim_filter._filters if isinstance(sim_filter, Pipe.FiltersFilter) else [sim_filter]
+        interactions = loaded_source
+
+        for filter, filter_key in zip(filters, filter_keys):
+
+            filter_uses[filter_key] -= 1
+
+            if filter_key in filtered_source:
+                interactions = filtered_source[filter_key] if filter_uses[filter_key] else filtered_source.pop(filter_key)
+            else:
+                interactions = filter.filter(interactions)
+                if filter_uses[filter_key]: filtered_source[filter_key] = interactions
 
-                    with CobaConfig.Logger.time(f"Creating source {src_id} from {source_by_id[src_id]}..."):
-                        #This is not ideal. I'm not sure how it should be improved so it is being left for now.
-                        loaded_source = list(source_by_id[src_id].read())
+        return interactions
 
-                    for sim_id, tasks_by_src_sim in groupby(sorted(tasks_by_src, key=srt_sim), key=grp_sim):
+    def _load_sources(self, sources: Sequence[Source], loaded_sources: Queue, stop_loading: Event) -> None:
 
-                        with CobaConfig.Logger.time(f"Creating simulation {sim_id} from source {src_id}..."):
-                            interactions = filter_by_id[sim_id].filter(loaded_source)
+        for source in sources:
 
-                        if not interactions:
-                            CobaConfig.Logger.log(f"Simulation {sim_id} has nothing to evaluate (likely due to `take` being larger than the simulation).")
-                            return
+            if stop_loading.is_set(): return
 
-                        for task in tasks_by_src_sim:
-                            try:
-                                for transaction in task.filter(interactions): 
-                                    yield transaction
-                            except Exception as e:
-                                CobaConfig.Logger.log_exception(e)
+            try:
+                #This is not ideal. I'm not sure how it should be improved so it is being left for now.
+                loaded_sources.put((list(source.read()), None))
+            except Exception as e:
+                loaded_sources.put((None, e))
 
-                except Exception as e:
-                    CobaConfig.Logger.log_exception(e)
\ No newline at end of file
+            #we wait for the source to be taken before reading the next one
+            #so that we never hold more than two loaded sources in memory
+            with loaded_sources.all_tasks_done:
+                while loaded_sources.unfinished_tasks and not stop_loading.is_set():
+                    loaded_sources.all_tasks_done.wait()
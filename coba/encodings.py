@@ -124,7 +124,7 @@ class StringEncoder(Encoder[str]):
         if not self.is_fit:
             raise Exception("This encoder must be fit before it can be used.")
 
-        return [str(value) for value in values]
+        return list(map(str,values))
 
 class NumericEncoder(Encoder[float]):
     """An Encoder implementation that turns incoming values into float values."""
@@ -191,7 +191,12 @@ class NumericEncoder(Encoder[float]):
                 except:
                     yield float('nan')
 
-        return list(float_generator())
+        #Most columns encode without any failures so we first try a map which runs its loop
+        #in C and only fall back to the slower per-value generator if some value can't be cast.
+        try:
+            return list(map(float,values))
+        except:
+            return list(float_generator())
 
 class OneHotEncoder(Encoder[Tuple[int,...]]):
     """An Encoder implementation that turns incoming values into a one hot representation."""
@@ -228,8 +233,9 @@ class OneHotEncoder(Encoder[Tuple[int,...]]):
                 known_onehots = [OneHotEncoder.MemoryEffecientStorage([1]),OneHotEncoder.MemoryEffecientStorage([0])]
             else:
                 unknown_onehot = float('nan')
-                known_onehots  = [ [0] * len(fit_values) for _ in range(len(fit_values)) ]
-                
+                known_onehots  = [ bytearray(len(fit_values)) for _ in range(len(fit_values)) ]
+
+                #bytearrays let us write the 1's without first creating k lists of k python ints
                 for i,k in enumerate(known_onehots):
                     k[i] = 1
 
@@ -270,7 +276,7 @@ class OneHotEncoder(Encoder[Tuple[int,...]]):
         if self.is_fit:
             raise Exception("This encoder has already been fit.")
 
-        fit_values = sorted(set(values), key=lambda v: values.index(v))
+        fit_values = list(dict.fromkeys(values))
 
         return OneHotEncoder(
             fit_values         = fit_values, 
@@ -294,7 +300,7 @@ class OneHotEncoder(Encoder[Tuple[int,...]]):
             raise Exception("This encoder must be fit before it can be used.")
 
         try:
-            return [ self._onehots[value] for value in values ]
+            return list(map(self._onehots.__getitem__, values))
         except KeyError as e:
             raise Exception(f"We were unable to find {e} in {self._onehots.keys()}")
 
@@ -373,7 +379,7 @@ class FactorEncoder(Encoder[int]):
             raise Exception("This encoder must be fit before it can be used.")
 
         try:
-            return [ self._levels[value] for value in values ]
+            return list(map(self._levels.__getitem__, values))
         except KeyError as e:
             raise Exception(f"We were unable to find {e} in {self._levels.keys()}") from None
 
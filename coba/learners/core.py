@@ -1,6 +1,7 @@
 """The expected interface for all learner implementations."""
 
 from abc import ABC, abstractmethod
+from copy import deepcopy
 from numbers import Number
 from typing import Any, Sequence, Dict, Union, Tuple, Optional
 
@@ -67,6 +68,16 @@ class Learner(ABC):
         """
         ...
     
+    def clone(self) -> 'Learner':
+        """An optional method that can be overridden to create an independent copy of the learner.
+
+        A fresh copy of the learner is made for every simulation it is evaluated on. By default
+        this is a deepcopy, so the learners given to a benchmark are expected to be untrained. A
+        deepcopy can be slow for learners with large or complex internal state. Such learners
+        may instead construct a new instance directly (e.g., `type(self)(**args)`).
+        """
+        return deepcopy(self)
+
     def __reduce__(self) -> Union[str, Tuple[Any, ...]]:
         """An optional method that can be overridden to make Learners picklable."""
         return super().__reduce__()
@@ -183,6 +194,10 @@ class SafeLearner(Learner):
         def __init__(self, learner: Learner) -> None:
             self._learner = learner
 
+        def clone(self) -> 'SafeLearner':
+            clone = getattr(self._learner, 'clone', None)
+            return SafeLearner(clone() if clone else deepcopy(self._learner))
+
         def predict(self, context: Context, actions: Sequence[Action]) -> Tuple[Probs, Info]:
             predict = self._learner.predict(context, actions)
 
@@ -69,6 +69,11 @@ class MultiprocessFilter(Filter[Iterable[Any], Iterable[Any]]):
         if len(self._filters) == 0:
             return items
 
+        #Pool.map_async materializes its items anyway so we do it here in order
+        #to avoid spawning more worker processes than there are items to process.
+        items     = list(items)
+        processes = max(1, min(self._processes, len(items)))
+
         try:
             with Manager() as manager:
 
@@ -113,7 +118,7 @@ class MultiprocessFilter(Filter[Iterable[Any], Iterable[Any]]):
 
                         return super()._join_exited_workers()
 
-                with MyPool(self._processes, maxtasksperchild=self._maxtasksperchild) as pool:
+                with MyPool(processes, maxtasksperchild=self._maxtasksperchild) as pool:
 
                     # handle not picklable (this is handled by done_or_failed)
                     # handle empty list (this is done by checking result.ready())
@@ -4,7 +4,9 @@ TODO add docstrings for all filters
 """
 import re
 import csv
+import codecs
 import collections
+import collections.abc
 import itertools
 import json
 
@@ -23,6 +25,10 @@ _T_DenseData  = Iterable[_T_DenseRow]
 _T_SparseData = Iterable[_T_SparseRow]
 _T_Data       = Union[_T_DenseData, _T_SparseData]
 
+#@ lines give metadata describing an arff file and always come at the top of the file. The @relation
+#line names the data, the @attribute lines type each column and the @data line marks when the data begins.
+_r_arff_meta = re.compile(r'^\s*@(attribute|relation|data)(.*)$', re.IGNORECASE)
+
 def _is_dense(items: _T_Data)-> Tuple[bool, _T_Data]:
 
     items = iter(items)
@@ -30,7 +36,7 @@ def _is_dense(items: _T_Data)-> Tuple[bool, _T_Data]:
 
     #a sparse item has the following structure ([ids], [values])
     #this check isn't full proof but I think should be good enough
-    is_dense = (len(item0) != 2) or not all([isinstance(i, collections.Sequence) and not isinstance(i, str) for i in item0])
+    is_dense = (len(item0) != 2) or not all(isinstance(i, collections.abc.Sequence) and not isinstance(i, str) for i in item0)
 
     return is_dense, itertools.chain([item0], items)
 
@@ -38,15 +44,17 @@ class Cartesian(Filter[Union[Any,Iterable[Any]], Iterable[Any]]):
 
     def __init__(self, filter: Union[Filter,Sequence[Filter]]):
         
-        self._filters = filter if isinstance(filter, collections.Sequence) else [filter]
+        self._filters = filter if isinstance(filter, collections.abc.Sequence) else [filter]
 
     def filter(self, item: Union[Any,Iterable[Any]]) -> Iterable[Any]:
 
-        items = item if isinstance(item, collections.Iterable) else [item]
-        
-        for item in items:
-            for filter in self._filters:
-                yield filter.filter(item)
+        items = item if isinstance(item, collections.abc.Iterable) else [item]
+
+        #Cartesian is almost always given a single filter in which case a map does the same work in C
+        if len(self._filters) == 1:
+            return map(self._filters[0].filter, items)
+
+        return ( filter.filter(item) for item in items for filter in self._filters )
 
 class IdentityFilter(Filter[Any, Any]):
     def filter(self, item:Any) -> Any:
@@ -71,7 +79,22 @@ class ResponseToLines(Filter[Response, Iterable[str]]):
             
             raise Exception(message) from None
 
-        return item.content.decode('utf-8').split('\n')
+        #utf-8 decoding is implemented in C with an ascii fast path so we always try it first and only
+        #fall back to the response's declared encoding when the content turns out to not be utf-8.
+        try:
+            text = item.content.decode('utf-8')
+        except UnicodeDecodeError:
+            encoding = item.encoding or 'latin-1'
+
+            #servers can declare a charset that Python doesn't know so we check it before decoding
+            try:
+                codecs.lookup(encoding)
+            except LookupError:
+                encoding = 'latin-1'
+
+            text = item.content.decode(encoding, errors='replace')
+
+        return text.split('\n')
 
 class JsonEncode(Filter[Any, str]):
 
@@ -123,25 +146,8 @@ class ArffReader(Filter[Iterable[str], _T_Data]):
 
     def __init__(self, skip_encoding: Union[bool,Sequence[Union[str,int]]] = False):
 
-        self._skip_encoding = skip_encoding
-
-        # Match a comment
-        self._r_comment = re.compile(r'^%')
-
-        # Match an empty line
-        self.r_empty = re.compile(r'^\s+$')
-
-        #@ lines give metadata describing the file. These always come at the top of the file
-        self._r_meta = re.compile(r'^\s*@\S*')
-
-        #The @relation line simply names the data. In practice we don't really care about it.
-        self._r_relation = re.compile(r'^@[Rr][Ee][Ll][Aa][Tt][Ii][Oo][Nn]\s*(\S*)')
-
-        #The @attribute lines contain typing information for 'columns'
-        self._r_attribute = re.compile(r'^\s*@[Aa][Tt][Tt][Rr][Ii][Bb][Uu][Tt][Ee]\s*(..*$)')
-
-        #The @data line indicates when the data begins. After @data there should be no more @ lines.
-        self._r_data = re.compile(r'^@[Dd][Aa][Tt][Aa]')
+        #a frozenset makes checking whether each attribute is skipped O(1)
+        self._skip_encoding = skip_encoding if isinstance(skip_encoding, bool) else frozenset(skip_encoding)
 
     def _determine_encoder(self, index:int, name: str, tipe: str) -> Encoder:
 
@@ -157,40 +163,35 @@ class ArffReader(Filter[Iterable[str], _T_Data]):
         return StringEncoder()
 
     def _parse_file(self, lines: Iterable[str]) -> Tuple[_T_Data,Sequence[Encoder]]:
-        in_meta_section=True
-        in_data_section=False
 
         headers   : List[str]     = []
         encoders  : List[Encoder] = []
-        data_lines: List[str]     = []
 
-        for line in lines:
+        lines = iter(lines)
 
-            if in_meta_section:
+        for line in lines:
 
-                if self._r_comment.match(line): continue
-                if self._r_relation.match(line): continue
+            meta_match = _r_arff_meta.match(line)
 
-                attribute_match = self._r_attribute.match(line)
+            #lines without an @ keyword (e.g., comments and blank lines) carry no metadata
+            if not meta_match: continue
 
-                if attribute_match:
-                    attribute_text  = attribute_match.group(1).strip()
-                    attribute_type  = re.split('[ ]', attribute_text, 1)[1]
-                    attribute_name  = re.split('[ ]', attribute_text)[0]
-                    attribute_index = len(headers)
+            meta_kind = meta_match.group(1).lower()
+            meta_body = meta_match.group(2).strip()
 
-                    headers.append(attribute_name)
-                    encoders.append(self._determine_encoder(attribute_index,attribute_name,attribute_type))
+            if meta_kind == 'attribute' and meta_body:
+                attribute_name, attribute_type = meta_body.split(' ', 1)
+                attribute_index = len(headers)
 
-                if self._r_data.match(line):
-                    in_data_section = True
-                    in_meta_section = False
-                    continue
+                headers.append(attribute_name)
+                encoders.append(self._determine_encoder(attribute_index,attribute_name,attribute_type))
 
-            if in_data_section and line != '':
-                data_lines.append(line)
+            if meta_kind == 'data':
+                break
 
-        parsed_data = CsvReader().filter(itertools.chain([",".join(headers)], data_lines))
+        #The remaining lines are all data. We hand them to CsvReader as they are rather than copying them
+        #into a list first so we don't hold an extra copy of every raw line. CsvReader drops empty lines.
+        parsed_data = CsvReader().filter(itertools.chain([",".join(headers)], lines))
 
         return parsed_data, encoders
 
@@ -207,7 +208,7 @@ class ArffReader(Filter[Iterable[str], _T_Data]):
 class CsvReader(Filter[Iterable[str], _T_Data]):
     def filter(self, items: Iterable[str]) -> _T_Data:
         
-        lines = iter(filter(None, csv.reader( i.strip() for i in items)))
+        lines = iter(filter(None, csv.reader(map(str.strip, items))))
 
         try:
             row1 = next(lines)
@@ -244,16 +245,18 @@ class CsvReader(Filter[Iterable[str], _T_Data]):
 
         for data_line in lines_iter:
 
-            index_list: List[int] = []
+            index_list: List[str] = []
             value_list: List[str] = []
 
             for item in data_line:
-                split = item.strip("}{").split(' ', 1)
-                
-                index_list.append(int(split[0]))
-                value_list.append(split[1])
+                index, separator, value = item.strip("}{").partition(' ')
+
+                if not separator: raise Exception(f"The sparse cell '{item}' doesn't have both an index and a value.")
+
+                index_list.append(index)
+                value_list.append(value)
 
-            yield ( tuple(index_list), tuple(value_list) )        
+            yield ( tuple(map(int,index_list)), tuple(value_list) )
 
 class LibSvmReader(Filter[Iterable[str], _T_Data]):
     
@@ -305,10 +308,12 @@ class Transpose(Filter[_T_Data, _T_Data]):
         else:
             sparse_transposed_items: Dict[int, Tuple[List[int],List[Any]]] = defaultdict( lambda: ([],[]))
 
-            for outer_id, item in enumerate(items):
-                for inner_id, value in zip(item[0], item[1]):
-                    sparse_transposed_items[inner_id][0].append(outer_id)
-                    sparse_transposed_items[inner_id][1].append(value)
+            for outer_id, (inner_ids, values) in enumerate(items):
+                for inner_id, value in zip(inner_ids, values):
+                    #a single lookup per value rather than one for each of the two appends
+                    outer_ids, inner_values = sparse_transposed_items[inner_id]
+                    outer_ids.append(outer_id)
+                    inner_values.append(value)
 
             max_key = max(sparse_transposed_items.keys())
 
@@ -339,11 +344,6 @@ class Flatten(Filter[_T_Data, _T_Data]):
                 else:
                     yield (tuple(col[0]), tuple(col[1]))
 
-        #return map(tuple,map(self._flat, data)) if is_dense else data
-
-    def _flat(self, item: Union[_T_DenseRow, _T_SparseRow] ) -> Union[_T_DenseRow, _T_SparseRow]:
-        return sum(map(self._flat, item),[]) if isinstance(item, collections.Sequence) else [item]
-
 class Encode(Filter[_T_Data, _T_Data]):
 
     #Assumes column major order
@@ -12,6 +12,7 @@ Remarks:
 """
 
 import math
+import bisect
 import random as std_random
 import itertools
 
@@ -109,14 +110,28 @@ class CobaRandom:
         if weights is None:
             return seq[self.randint(0, len(seq)-1)]
         else:
+            return seq[self.choice_index(weights)]
 
-            if sum(weights) == 0:
-                raise ValueError("The sume of weights cannot be zero.")
+    def choice_index(self, weights: Sequence[float], uniform: float = None) -> int:
+        """Choose a random index according to the given weights.
 
-            cdf = list(itertools.accumulate(weights))
-            rng = self.random() * sum(weights)
+        Args:
+            weights: The proportion by which each index is selected.
+            uniform: An optional, already drawn, uniform random number in [0,1] to select with.
+
+        Returns:
+            The selected index.
+        """
+
+        cdf = list(itertools.accumulate(weights))
+
+        if not cdf or cdf[-1] == 0:
+            raise ValueError("The sume of weights cannot be zero.")
 
-            return seq[[ rng <= c for c in cdf].index(True)]
+        if uniform is None: uniform = self.random()
+
+        #bisect_left finds the first c in cdf where rng <= c with a binary search in C
+        return bisect.bisect_left(cdf, uniform * cdf[-1])
 
     def _next(self, n: int) -> Sequence[int]:
         """Generate `n` uniform random numbers in [0,m-1]
@@ -199,6 +214,16 @@ def choice(seq: Sequence[Any], weights:Sequence[float]=None) -> Any:
     
     return _random.choice(seq, weights)
 
+def choice_index(weights: Sequence[float], uniform: float = None) -> int:
+    """Choose a random index according to the given weights.
+
+    Args:
+        weights: The proportion by which each index is selected.
+        uniform: An optional, already drawn, uniform random number in [0,1] to select with.
+    """
+
+    return _random.choice_index(weights, uniform)
+
 def shuffle(array_like: Sequence[Any]) -> Sequence[Any]:
     """Shuffle the order of items in a sequence.
 
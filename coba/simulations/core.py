@@ -175,8 +175,17 @@ class ClassificationSimulation(Simulation):
         in_multilabel = lambda action,label: isinstance(label,collections.Sequence) and action in label #type: ignore
 
         contexts  = features 
-        actions   = list(sorted(set(labels_flat), key=lambda l: labels_flat.index(l)))
-        feedbacks = [ [ feedback(action,label) for action in actions ] for label in labels ]
+        actions   = list(dict.fromkeys(labels_flat))
+
+        try:
+            unique_labels = dict.fromkeys(labels)
+        except TypeError:
+            #unhashable labels (e.g., multilabel lists) can't be cached so we calculate them all
+            feedbacks = [ [ feedback(action,label) for action in actions ] for label in labels ]
+        else:
+            #labels repeat heavily so we only calculate the feedbacks for each unique label once
+            label_feedbacks = { label: [ feedback(action,label) for action in actions ] for label in unique_labels }
+            feedbacks       = list(map(label_feedbacks.__getitem__, labels))
 
         self._interactions = list(map(Interaction, contexts, repeat(actions), feedbacks))
 
@@ -261,7 +270,23 @@ class ReaderSimulation(Simulation):
         else:
             label_col_index = self._label_column
 
-        parsed_cols = list(Transpose().filter(parsed_rows_iter))
+        parsed_rows = list(parsed_rows_iter)
+
+        is_sparse_rows = len(parsed_rows[0]) == 2 and isinstance(parsed_rows[0][0],tuple) and isinstance(parsed_rows[0][1],tuple)
+
+        if not is_sparse_rows:
+            #dense rows let us pull the label out of each row directly rather than transposing twice
+            feature_rows = []
+            dense_labels = []
+
+            for parsed_row in parsed_rows:
+                feature_row = list(parsed_row)
+                dense_labels.append(feature_row.pop(label_col_index))
+                feature_rows.append(tuple(feature_row))
+
+            return ClassificationSimulation(feature_rows, dense_labels).read()
+
+        parsed_cols = list(Transpose().filter(parsed_rows))
         
         label_col    = parsed_cols.pop(label_col_index)
         feature_rows = list(Transpose().filter(parsed_cols))
@@ -415,8 +440,11 @@ class RegressionSimulation(Simulation):
         feedback  = lambda action,label: -abs(float(action)-float(label))
 
         contexts  = features 
-        actions   = list(sorted(set(labels_flat), key=lambda l: labels_flat.index(l)))
-        feedbacks = [ [ feedback(action,label) for action in actions ] for label in labels ]
+        actions   = list(dict.fromkeys(labels_flat))
+
+        #labels repeat heavily so we only calculate the feedbacks for each unique label once
+        label_feedbacks = { label: [ feedback(action,label) for action in actions ] for label in dict.fromkeys(labels) }
+        feedbacks       = list(map(label_feedbacks.__getitem__, labels))
 
         self._interactions = list(map(Interaction, contexts, repeat(actions), feedbacks))
 
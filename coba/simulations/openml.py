@@ -1,7 +1,8 @@
 import json
+import pickle
 
 from math import isnan
-from itertools import compress
+from itertools import compress, islice
 from hashlib import md5
 from numbers import Number
 from typing import Optional, Tuple, Sequence, Any, List, Iterable
@@ -11,6 +12,9 @@ from coba.config import CobaConfig, CobaException
 
 from coba.simulations.core import Context, Action, ClassificationSimulation, Interaction, Simulation, RegressionSimulation
 
+#This must be incremented whenever the parsing of openml data changes so that stale parsed results aren't used
+_PARSED_CACHE_VERSION = 1
+
 class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
 
     def __init__(self, id:int, md5_checksum:str = None):
@@ -23,6 +27,17 @@ class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
         from coba.encodings import Encoder, NumericEncoder, OneHotEncoder, StringEncoder
         from coba.pipes     import ArffReader, CsvReader, Encode, Flatten, Transpose
 
+        #parsing the raw openml files can take longer than downloading them so we also cache the parsed result.
+        #The parsed result is never checked against md5_checksum so the checksum is part of the key instead.
+        p_key = f"openml_classification_v{_PARSED_CACHE_VERSION}_{self._data_id}_{self._md5_checksum}.pickle"
+
+        if p_key in CobaConfig.Cacher:
+            try:
+                return pickle.loads(CobaConfig.Cacher.get(p_key))
+            except Exception:
+                #a corrupted cache entry shouldn't stop us from parsing the data again
+                CobaConfig.Cacher.rmv(p_key)
+
         d_key = None
         t_key = None
         o_key = None
@@ -67,8 +82,10 @@ class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
             if target=="" or isinstance(encoders[headers.index(target)], NumericEncoder):
                 target = self._get_classification_target(data_id)
 
-            ignored[headers.index(target)] = False
-            encoders[headers.index(target)] = StringEncoder()
+            target_index = headers.index(target)
+
+            ignored[target_index]  = False
+            encoders[target_index] = StringEncoder()
 
             csv_url  = f"http://www.openml.org/data/v1/get_csv/{d_object['file_id']}"
             arff_url = f"http://www.openml.org/data/v1/download/{d_object['file_id']}"
@@ -95,18 +112,23 @@ class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
             is_sparse_data = isinstance(file_rows[0], tuple) and len(file_rows[0]) == 2
 
             if is_sparse_data:
-                file_headers  = [ header.lower() for header in file_rows.pop(0)[1]]
+                file_headers  = [ header.lower() for header in file_rows[0][1]]
             else:
-                file_headers  = [ header.lower() for header in file_rows.pop(0)]
+                file_headers  = [ header.lower() for header in file_rows[0]]
+
+            #we skip the header row with islice because popping it shifts every row in file_rows
+            file_cols = list(Transpose().filter(islice(file_rows,1,None)))
 
-            file_cols = list(Transpose().filter(file_rows))
+            #popping each ignored column shifts every column after it so we keep the rest in one pass instead
+            ignored_headers = set(compress(headers, ignored))
+            is_kept         = [ header not in ignored_headers for header in file_headers ]
 
-            for ignored_header in compress(headers, ignored):
-                if ignored_header in file_headers:
-                    file_cols.pop(file_headers.index(ignored_header))
-                    file_headers.remove(ignored_header)
+            file_cols    = list(compress(file_cols, is_kept))
+            file_headers = list(compress(file_headers, is_kept))
 
-            file_encoders = [ encoders[headers.index(file_header)] for file_header in file_headers]
+            #a dict avoids scanning every header for every column of wide datasets
+            encoder_by_header = dict(zip(headers, encoders))
+            file_encoders     = [ encoder_by_header[file_header] for file_header in file_headers ]
 
             file_cols    = list(Encode(file_encoders).filter(file_cols))
             label_col    = file_cols.pop(file_headers.index(target))
@@ -131,7 +153,9 @@ class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
 
             feature_rows    = list(compress(feature_rows, no_missing_values))
             dense_label_col = list(compress(dense_label_col, no_missing_values)) 
-            
+
+            if p_key not in CobaConfig.Cacher: CobaConfig.Cacher.put(p_key, pickle.dumps((feature_rows, dense_label_col)))
+
             return feature_rows, dense_label_col
 
         except KeyboardInterrupt:
@@ -141,8 +165,8 @@ class OpenmlSource(Source[Tuple[Sequence[Context], Sequence[Action]]]):
         except Exception:
             #if something went wrong we want to clear the
             #cache just in case it was corrupted somehow
-            for k in [d_key, t_key, o_key]:
-                if k is not None: CobaConfig.Cacher.rmv(k)
+            for k in [d_key, t_key, o_key, p_key]:
+                if k is not None and k in CobaConfig.Cacher: CobaConfig.Cacher.rmv(k)
             
             raise
 
@@ -258,6 +282,17 @@ class OpenmlRegressionSource(Source[Tuple[Sequence[Context], Sequence[Action]]])
         from coba.encodings import Encoder, NumericEncoder, OneHotEncoder, StringEncoder
         from coba.pipes     import ArffReader, CsvReader, Encode, Flatten, Transpose
 
+        #parsing the raw openml files can take longer than downloading them so we also cache the parsed result.
+        #The parsed result is never checked against md5_checksum so the checksum is part of the key instead.
+        p_key = f"openml_regression_v{_PARSED_CACHE_VERSION}_{self._data_id}_{self._md5_checksum}.pickle"
+
+        if p_key in CobaConfig.Cacher:
+            try:
+                return pickle.loads(CobaConfig.Cacher.get(p_key))
+            except Exception:
+                #a corrupted cache entry shouldn't stop us from parsing the data again
+                CobaConfig.Cacher.rmv(p_key)
+
         d_key = None
         t_key = None
         o_key = None
@@ -301,8 +336,10 @@ class OpenmlRegressionSource(Source[Tuple[Sequence[Context], Sequence[Action]]])
             if target=="" or not isinstance(encoders[headers.index(target)], NumericEncoder):
                 target = self._get_regression_target(data_id)
 
-            ignored[headers.index(target)] = False
-            encoders[headers.index(target)] = StringEncoder()
+            target_index = headers.index(target)
+
+            ignored[target_index]  = False
+            encoders[target_index] = StringEncoder()
 
             csv_url  = f"http://www.openml.org/data/v1/get_csv/{d_object['file_id']}"
             arff_url = f"http://www.openml.org/data/v1/download/{d_object['file_id']}"
@@ -329,18 +366,23 @@ class OpenmlRegressionSource(Source[Tuple[Sequence[Context], Sequence[Action]]])
             is_sparse_data = isinstance(file_rows[0], tuple) and len(file_rows[0]) == 2
 
             if is_sparse_data:
-                file_headers  = [ header.lower() for header in file_rows.pop(0)[1]]
+                file_headers  = [ header.lower() for header in file_rows[0][1]]
             else:
-                file_headers  = [ header.lower() for header in file_rows.pop(0)]
+                file_headers  = [ header.lower() for header in file_rows[0]]
+
+            #we skip the header row with islice because popping it shifts every row in file_rows
+            file_cols = list(Transpose().filter(islice(file_rows,1,None)))
 
-            file_cols = list(Transpose().filter(file_rows))
+            #popping each ignored column shifts every column after it so we keep the rest in one pass instead
+            ignored_headers = set(compress(headers, ignored))
+            is_kept         = [ header not in ignored_headers for header in file_headers ]
 
-            for ignored_header in compress(headers, ignored):
-                if ignored_header in file_headers:
-                    file_cols.pop(file_headers.index(ignored_header))
-                    file_headers.remove(ignored_header)
+            file_cols    = list(compress(file_cols, is_kept))
+            file_headers = list(compress(file_headers, is_kept))
 
-            file_encoders = [ encoders[headers.index(file_header)] for file_header in file_headers]
+            #a dict avoids scanning every header for every column of wide datasets
+            encoder_by_header = dict(zip(headers, encoders))
+            file_encoders     = [ encoder_by_header[file_header] for file_header in file_headers ]
 
             file_cols    = list(Encode(file_encoders).filter(file_cols))
             label_col    = file_cols.pop(file_headers.index(target))
@@ -358,6 +400,8 @@ class OpenmlRegressionSource(Source[Tuple[Sequence[Context], Sequence[Action]]])
             else:
                 dense_label_col = list(label_col)
 
+            if p_key not in CobaConfig.Cacher: CobaConfig.Cacher.put(p_key, pickle.dumps((feature_rows, dense_label_col)))
+
             return feature_rows, dense_label_col
 
         except KeyboardInterrupt:
@@ -367,8 +411,8 @@ class OpenmlRegressionSource(Source[Tuple[Sequence[Context], Sequence[Action]]])
         except Exception:
             #if something went wrong we want to clear the
             #cache just in case it was corrupted somehow
-            for k in [d_key, t_key, o_key]:
-                if k is not None: CobaConfig.Cacher.rmv(k)
+            for k in [d_key, t_key, o_key, p_key]:
+                if k is not None and k in CobaConfig.Cacher: CobaConfig.Cacher.rmv(k)
             
             raise
 
@@ -245,6 +245,23 @@ class Benchmark_Single_Tests(unittest.TestCase):
         self.assertCountEqual(actual_simulations, expected_simulations)
         self.assertCountEqual(actual_interactions, expected_interactions)
 
+    def test_shards(self):
+        sim1      = LambdaSimulation(2, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim2      = LambdaSimulation(3, lambda i: i, lambda i,c: [3,4,5], lambda i,c,a: cast(float,a))
+        learner1  = ModuloLearner("0") #type: ignore
+        learner2  = ModuloLearner("1") #type: ignore
+
+        expected_result = Benchmark([sim1,sim2]).evaluate([learner1, learner2])
+        sharded_results = [ Benchmark([sim1,sim2]).shard(i,3).evaluate([learner1, learner2]) for i in range(3) ]
+
+        actual_simulations  = [ row for result in sharded_results for row in result.simulations.to_tuples() ]
+        actual_interactions = [ row for result in sharded_results for row in result.interactions.to_tuples() ]
+
+        #each shard only evaluates some of the tasks but together the shards evaluate every task exactly once
+        self.assertTrue(all(len(result.interactions.to_tuples()) < 10 for result in sharded_results))
+        self.assertCountEqual(expected_result.simulations.to_tuples(), actual_simulations)
+        self.assertCountEqual(expected_result.interactions.to_tuples(), actual_interactions)
+
     def test_learn_info_learners(self):
         sim       = LambdaSimulation(2, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
         learner1  = LearnInfoLearner("0") #type: ignore
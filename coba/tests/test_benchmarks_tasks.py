@@ -1,15 +1,21 @@
 from coba.simulations.core import ClassificationSimulation
+import time
 import unittest
 
+from unittest.mock import patch
+from threading import Event
+from collections import Counter
+
 from typing import cast, Iterable, Any
 
-from coba.simulations import LambdaSimulation, Interaction
-from coba.pipes import Source, Pipe, IdentityFilter
+from coba.simulations import LambdaSimulation, Interaction, Shuffle, Take
+from coba.pipes import Source, Pipe, IdentityFilter, MemorySink
+from coba.config import CobaConfig, BasicLogger
 from coba.learners import Learner
 
 from coba.benchmarks.results import Result
 from coba.benchmarks.tasks import (
-    Task, SimulationTask, EvaluationTask, CreateTasks, FilterFinished, ChunkBySource, ProcessTasks
+    Task, SimulationTask, EvaluationTask, CreateTasks, FilterFinished, ChunkBySource, ProcessTasks, Shard
 )
 
 #for testing purposes
@@ -48,6 +54,15 @@ class ObserveTask(Task):
     def filter(self, interactions: Iterable[Interaction]) -> Iterable[Any]:
         self.observed = list(interactions)
 
+class YieldTask(Task):
+    def filter(self, interactions: Iterable[Interaction]) -> Iterable[Any]:
+        for interaction in interactions:
+            yield interaction.context
+
+class BrokenSource(Source):
+    def read(self):
+        raise Exception("Broken source")
+
 class CountReadSimulation:
     def __init__(self) -> None:
         self._reads = 0
@@ -129,6 +144,22 @@ class Tasks_Tests(unittest.TestCase):
         self.assertEqual(5, len(set([id(t.learner) for t in tasks ])))
         self.assertEqual(1, len(set([id(t.sim_source) for t in tasks ])))
 
+    def test_two_srcs_share_ids(self):
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        src2 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+
+        sim1 = Pipe.join(src1, [IdentityFilter()])
+        sim2 = Pipe.join(src2, [IdentityFilter()])
+        sim3 = Pipe.join(src1, [IdentityFilter()])
+        lrn1 = ModuloLearner("1")
+
+        tasks = list(CreateTasks([sim1,sim2,sim3], [lrn1], seed=10).read())
+
+        self.assertEqual(6, len(tasks))
+
+        self.assertEqual([0,1,0,0,1,0], [t.src_id for t in tasks])
+        self.assertEqual([0,1,2,0,1,2], [t.sim_id for t in tasks])
+
 class Unifinshed_Tests(unittest.TestCase):
 
     def test_one_finished(self):
@@ -157,6 +188,63 @@ class Unifinshed_Tests(unittest.TestCase):
         self.assertEqual(0, unfinished_tasks[1].lrn_id)
         self.assertEqual(1, unfinished_tasks[2].lrn_id)
 
+    def test_simulation_finished(self):
+
+        restored = Result(sim_rows=[dict(simulation_id=0)])
+
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+
+        tasks = [
+            SimulationTask(0,0,None,sim1,None),
+            SimulationTask(0,1,None,sim1,None),
+        ]
+
+        unfinished_tasks = list(FilterFinished(restored).filter(tasks))
+
+        self.assertEqual(1, len(unfinished_tasks))
+        self.assertEqual(1, unfinished_tasks[0].sim_id)
+
+class Shard_Tests(unittest.TestCase):
+
+    def test_shards_partition_tasks(self):
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim2 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        lrn1 = ModuloLearner("1")
+        lrn2 = ModuloLearner("2")
+
+        tasks  = list(CreateTasks([sim1,sim2], [lrn1,lrn2], seed=10).read())
+        shards = [ list(Shard(i,3).filter(tasks)) for i in range(3) ]
+
+        sharded_keys = [ (t.sim_id, t.lrn_id) for shard in shards for t in shard ]
+
+        self.assertEqual(len(tasks), len(sharded_keys))
+        self.assertEqual(set((t.sim_id, t.lrn_id) for t in tasks), set(sharded_keys))
+
+    def test_shards_are_fixed(self):
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim2 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        lrn1 = ModuloLearner("1")
+        lrn2 = ModuloLearner("2")
+
+        tasks  = list(CreateTasks([sim1,sim2], [lrn1,lrn2], seed=10).read())
+        shards = [ set((t.sim_id, t.lrn_id) for t in Shard(i,3).filter(tasks)) for i in range(3) ]
+
+        self.assertEqual({(0,None),(1,1)}, shards[0])
+        self.assertEqual({(0,0),(1,None)}, shards[1])
+        self.assertEqual({(0,1),(1,0)}, shards[2])
+
+    def test_one_shard_keeps_all(self):
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        lrn1 = ModuloLearner("1")
+
+        tasks = list(CreateTasks([sim1], [lrn1], seed=10).read())
+
+        self.assertEqual(tasks, list(Shard(0,1).filter(tasks)))
+
+    def test_bad_shard(self):
+        with self.assertRaises(AssertionError):
+            Shard(2,2)
+
 class GroupBySource_Tests(unittest.TestCase):
 
     def test_one_group(self):
@@ -322,5 +410,178 @@ class EvaluationTask_Tests(unittest.TestCase):
         self.assertEqual(task1.observed[0].context, (0,0))
         self.assertEqual(task2.observed[0].context, (0,1))
 
+    def test_two_tasks_one_source_shared_filter_prefix(self):
+
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim1 = Pipe.join(src1, [Shuffle(1), Take(2)])
+        sim2 = Pipe.join(src1, [Shuffle(1), Take(3)])
+        sim3 = Pipe.join(src1, [Shuffle(2), Take(3)])
+        lrn1 = ModuloLearner("1")
+
+        task1 = ObserveTask(0, 0, 0, sim1, lrn1)
+        task2 = ObserveTask(0, 1, 0, sim2, lrn1)
+        task3 = ObserveTask(0, 2, 0, sim3, lrn1)
+
+        with patch.object(Shuffle, 'filter', autospec=True, side_effect=Shuffle.filter) as shuffle_filter:
+            list(ProcessTasks().filter([[task1, task2, task3]]))
+
+        self.assertEqual(2, shuffle_filter.call_count)
+
+        self.assertEqual([i.context for i in sim1.read()], [i.context for i in task1.observed])
+        self.assertEqual([i.context for i in sim2.read()], [i.context for i in task2.observed])
+        self.assertEqual([i.context for i in sim3.read()], [i.context for i in task3.observed])
+
+    def test_three_tasks_one_source_unseeded_shuffles(self):
+
+        src1 = LambdaSimulation(20, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sims = [ Pipe.join(src1, [Shuffle(None)]) for _ in range(3) ]
+        lrn1 = ModuloLearner("1")
+
+        tasks = [ ObserveTask(0, i, 0, sim, lrn1) for i, sim in enumerate(sims) ]
+
+        list(ProcessTasks().filter([tasks]))
+
+        #each unseeded shuffle draws its own seed so they must not share output
+        orders = [ tuple(i.context for i in task.observed) for task in tasks ]
+
+        self.assertEqual(3, len(set(orders)))
+
+    def test_two_tasks_one_source_shuffle_subclass(self):
+
+        shuffles = []
+
+        class CountShuffle(Shuffle):
+            def filter(self, interactions):
+                shuffles.append(self._seed)
+                return super().filter(interactions)
+
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim1 = Pipe.join(src1, [CountShuffle(1), Take(2)])
+        sim2 = Pipe.join(src1, [CountShuffle(1), Take(3)])
+        lrn1 = ModuloLearner("1")
+
+        task1 = ObserveTask(0, 0, 0, sim1, lrn1)
+        task2 = ObserveTask(0, 1, 0, sim2, lrn1)
+
+        list(ProcessTasks().filter([[task1, task2]]))
+
+        #a subclass may change filter without changing its repr so its output is never shared
+        self.assertEqual([1,1], shuffles)
+
+    def test_broken_source_is_logged_and_skipped(self):
+
+        logger = CobaConfig.Logger
+        self.addCleanup(setattr, CobaConfig, 'Logger', logger)
+        CobaConfig.Logger = BasicLogger(MemorySink())
+
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        lrn1 = ModuloLearner("1")
+
+        task1 = ObserveTask(0, 0, 0, BrokenSource(), lrn1)
+        task2 = ObserveTask(1, 1, 0, sim1, lrn1)
+
+        list(ProcessTasks().filter([[task1, task2]]))
+
+        self.assertFalse(hasattr(task1, 'observed'))
+        self.assertEqual(len(task2.observed), 5)
+        self.assertEqual(1, sum([int("Broken source" in item) for item in CobaConfig.Logger.sink.items]))
+
+    def test_empty_simulation_is_skipped(self):
+
+        logger = CobaConfig.Logger
+        self.addCleanup(setattr, CobaConfig, 'Logger', logger)
+        CobaConfig.Logger = BasicLogger(MemorySink())
+
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim1 = Pipe.join(src1, [Take(10)])
+        sim2 = Pipe.join(src1, [Take(2)])
+        lrn1 = ModuloLearner("1")
+
+        task1 = ObserveTask(0, 0, 0, sim1, lrn1)
+        task2 = ObserveTask(0, 1, 0, sim2, lrn1)
+
+        list(ProcessTasks().filter([[task1, task2]]))
+
+        self.assertFalse(hasattr(task1, 'observed'))
+        self.assertEqual(len(task2.observed), 2)
+        self.assertEqual(1, sum([int("Simulation 0 has nothing to evaluate" in item) for item in CobaConfig.Logger.sink.items]))
+
+    def test_early_stop_does_not_wait_for_source_read(self):
+
+        reading = Event()
+        release = Event()
+
+        class SlowSource(Source):
+            def read(self):
+                reading.set()
+                release.wait(5)
+                return []
+
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        lrn1 = ModuloLearner("1")
+
+        tasks = [ YieldTask(0, 0, 0, sim1, lrn1), YieldTask(1, 1, 0, SlowSource(), lrn1) ]
+
+        transactions = ProcessTasks().filter([tasks])
+
+        self.assertEqual(0, next(transactions))
+        self.assertTrue(reading.wait(5))
+
+        start = time.time()
+        transactions.close()
+        release.set()
+
+        self.assertLess(time.time()-start, 1)
+
+    def test_filter_source_only_keeps_shared_prefixes(self):
+
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sim1 = Pipe.join(src1, [Shuffle(1), Take(2)])
+        sim2 = Pipe.join(src1, [Shuffle(1), Take(3)])
+
+        process     = ProcessTasks()
+        loaded      = list(src1.read())
+        memo        = {}
+        filter_uses = Counter(key for sim in [sim1,sim2] for key in process._filter_keys(sim._filter))
+
+        process._filter_source(loaded, sim1._filter, memo, filter_uses)
+        self.assertEqual([('{"Shuffle":1}',)], list(memo.keys()))
+
+        process._filter_source(loaded, sim2._filter, memo, filter_uses)
+        self.assertEqual({}, memo)
+
+    def test_filter_source_keeps_nothing_for_seed_sweep(self):
+
+        src1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        sims = [ Pipe.join(src1, [Shuffle(seed), Take(2)]) for seed in range(3) ]
+
+        process     = ProcessTasks()
+        loaded      = list(src1.read())
+        memo        = {}
+        filter_uses = Counter(key for sim in sims for key in process._filter_keys(sim._filter))
+
+        for sim in sims:
+            self.assertEqual([i.context for i in sim.read()], [i.context for i in process._filter_source(loaded, sim._filter, memo, filter_uses)])
+            self.assertEqual({}, memo)
+
+    def test_evaluation_zero_pmf(self):
+
+        class ZeroLearner(Learner):
+            family = "Zero"
+            params = {}
+            def predict(self, context, actions):
+                return [0]*len(actions), {}
+            def learn(self, context, action, reward, probability, info):
+                pass
+
+        sim1 = LambdaSimulation(5, lambda i: i, lambda i,c: [0,1,2], lambda i,c,a: cast(float,a))
+        task = EvaluationTask(0, 0, 0, sim1, ZeroLearner(), 10)
+
+        #we skip SafeLearner's checks since they are removed when running with `python -O`
+        task.learner = ZeroLearner()
+
+        with self.assertRaises(ValueError):
+            list(task.filter(sim1.read()))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
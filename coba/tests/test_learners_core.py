@@ -55,6 +55,37 @@ class SafeLearner_Tests(unittest.TestCase):
         learner = SafeLearner(SafeLearner_Tests.NoFamilyOrParamLearner())
         self.assertEqual({}, learner.params)
 
+    def test_no_clone(self):
+        wrapped = SafeLearner_Tests.NoFamilyOrParamLearner()
+        learner = SafeLearner(wrapped).clone()
+
+        self.assertIsInstance(learner, SafeLearner)
+        self.assertIsInstance(learner._learner, SafeLearner_Tests.NoFamilyOrParamLearner)
+        self.assertIsNot(wrapped, learner._learner)
+
+    def test_clone(self):
+        wrapped = FixedLearner([1/2,1/2])
+        cloned  = FixedLearner([1/2,1/2])
+
+        wrapped.clone = lambda: cloned
+
+        learner = SafeLearner(wrapped).clone()
+
+        self.assertIs(cloned, learner._learner)
+
+    def test_broken_clone(self):
+        wrapped = FixedLearner([1/2,1/2])
+
+        def broken_clone():
+            raise AttributeError("broken clone")
+
+        wrapped.clone = broken_clone
+
+        with self.assertRaises(AttributeError) as e:
+            SafeLearner(wrapped).clone()
+
+        self.assertEqual("broken clone", str(e.exception))
+
     def test_no_sum_one_no_info_action_match_predict(self):
         learner = SafeLearner(SafeLearner_Tests.UncheckedFixedLearner([1/3,1/2], None))
 
@@ -1,6 +1,8 @@
 import unittest
 
-from coba.pipes import LibSvmReader, ArffReader, CsvReader, Flatten, Transpose, Encode, JsonEncode
+from requests import Response
+
+from coba.pipes import LibSvmReader, ArffReader, CsvReader, Flatten, Transpose, Encode, JsonEncode, ResponseToLines, Cartesian
 from coba.encodings import NumericEncoder, OneHotEncoder
 from coba.config import NoneLogger, CobaConfig
 
@@ -16,6 +18,10 @@ class CsvReader_Tests(unittest.TestCase):
     def test_sparse(self):
         self.assertEqual([((0,1,2),('a','b','c')), ((0,2),('1','2')), ((1,),('3',))], list(CsvReader().filter(['a,b,c', '{0 1,2 2}', '{1 3}'])))
 
+    def test_sparse_sans_value(self):
+        with self.assertRaises(Exception):
+            list(CsvReader().filter(['{0 1,2 2}', '{0}']))
+
 class ArffReader_Tests(unittest.TestCase):
 
     def test_dense_sans_empty(self):
@@ -314,5 +320,45 @@ class JsonEncode_Tests(unittest.TestCase):
     def test_dict_minified(self):
         self.assertEqual('{"a":[1.23,2],"b":{"c":1}}',JsonEncode().filter({'a':[1.23,2],'b':{'c':1.}}))
 
+class ResponseToLines_Tests(unittest.TestCase):
+
+    def _response(self, content: bytes, encoding: str = None) -> Response:
+        response = Response()
+        response.status_code = 200
+        response._content    = content
+        response.encoding    = encoding
+        return response
+
+    def test_utf8(self):
+        self.assertEqual(['a,b','ü,2'], ResponseToLines().filter(self._response('a,b\nü,2'.encode('utf-8'))))
+
+    def test_declared_encoding(self):
+        self.assertEqual(['a,b','ü,2'], ResponseToLines().filter(self._response('a,b\nü,2'.encode('cp1252'), 'cp1252')))
+
+    def test_undeclared_encoding(self):
+        self.assertEqual(['a,b','ü,2'], ResponseToLines().filter(self._response('a,b\nü,2'.encode('latin-1'))))
+
+    def test_unknown_declared_encoding(self):
+        self.assertEqual(['a,b','ü,2'], ResponseToLines().filter(self._response('a,b\nü,2'.encode('latin-1'), 'not-a-charset')))
+
+    def test_bad_status(self):
+        response = self._response(b'')
+        response.status_code = 404
+
+        with self.assertRaises(Exception):
+            ResponseToLines().filter(response)
+
+class Cartesian_Tests(unittest.TestCase):
+
+    def test_one_filter(self):
+        self.assertEqual(['1','2'], list(Cartesian(JsonEncode()).filter([1,2])))
+
+    def test_two_filters(self):
+        filters = [JsonEncode(), JsonEncode(minify=False)]
+        self.assertEqual(['[1,2]','[1, 2]','[3]','[3]'], list(Cartesian(filters).filter([[1,2],[3]])))
+
+    def test_not_iterable(self):
+        self.assertEqual(['1'], list(Cartesian(JsonEncode()).filter(1)))
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
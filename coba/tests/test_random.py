@@ -258,5 +258,23 @@ class Random_Tests(unittest.TestCase):
 
         self.assertIsInstance(choice, tuple)
 
+    def test_choice_index_uniform(self):
+        self.assertEqual(0, coba.random.choice_index([0.25,0.5,0.25], 0.2))
+        self.assertEqual(1, coba.random.choice_index([0.25,0.5,0.25], 0.5))
+        self.assertEqual(2, coba.random.choice_index([0.25,0.5,0.25], 0.9))
+
+    def test_choice_index_matches_choice(self):
+        coba.random.seed(10)
+        index = coba.random.choice_index([1/1000]*1000)
+
+        coba.random.seed(10)
+        choice = coba.random.choice(list(range(1000)), [1/1000]*1000)
+
+        self.assertEqual(choice, index)
+
+    def test_choice_index_zero_weights(self):
+        with self.assertRaises(ValueError):
+            coba.random.choice_index([0,0], 0.5)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file